@@ -1,11 +1,14 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
 import numpy as np
-from scipy.stats import pearsonr, linregress
-from scipy import stats
 import matplotlib.font_manager as fm
+from matplotlib.colors import LinearSegmentedColormap, to_rgba
 import os
+import io
+import glob
 import warnings
 
 # ===================== 1. 全局配置 =====================
@@ -19,28 +22,30 @@ st.set_page_config(
 warnings.filterwarnings('ignore')
 
 # ----------------- 字体智能加载 -----------------
-font_files = ['font.otf', 'font.ttf', 'simhei.ttf']
-font_loaded = False
-for font_file in font_files:
-    if os.path.exists(font_file):
-        try:
-            fm.fontManager.addfont(font_file)
-            font_prop = fm.FontProperties(fname=font_file)
-            plt.rcParams['font.family'] = font_prop.get_name()
-            font_loaded = True
-            break
-        except: pass
-
-if not font_loaded:
+@st.cache_resource
+def setup_fonts():
+    """字体探测与注册只在进程内执行一次"""
+    font_files = ['font.otf', 'font.ttf', 'simhei.ttf']
+    for font_file in font_files:
+        if os.path.exists(font_file):
+            try:
+                fm.fontManager.addfont(font_file)
+                font_prop = fm.FontProperties(fname=font_file)
+                matplotlib.rcParams['font.family'] = font_prop.get_name()
+                return True
+            except: pass
+
     import platform
     if platform.system() == 'Windows':
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
+        matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
     elif platform.system() == 'Darwin':
-        plt.rcParams['font.sans-serif'] = ['Arial Unicode MS']
+        matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS']
     else:
-        plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
+        matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans']
+    return False
 
-plt.rcParams['axes.unicode_minus'] = False
+setup_fonts()
+matplotlib.rcParams['axes.unicode_minus'] = False
 
 # ----------------- CSS 样式 (含上传组件汉化 + 侧边栏修复) -----------------
 st.markdown("""
@@ -167,11 +172,27 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ===================== 2. 数据处理核心 =====================
+# 磁盘缓存的格式版本，修改 load_data 的清洗逻辑时递增
+DATA_CACHE_VERSION = 1
+
 @st.cache_data
 def load_data(file):
     try:
-        df = pd.read_csv(file)
-        if 'Player_Name' in df.columns and 'Year' in df.columns:
+        # 本地 CSV 的清洗结果另存为 parquet，文件名带上 CSV 的修改时间与大小，两者完全一致才复用
+        cache_base = cache_path = None
+        if isinstance(file, str):
+            info = os.stat(file)
+            cache_base = f"{file}.v{DATA_CACHE_VERSION}.{info.st_mtime_ns}-{info.st_size}"
+            cache_path = f"{cache_base}.parquet"
+            if os.path.exists(cache_path):
+                try:
+                    return pd.read_parquet(cache_path)
+                except Exception:
+                    pass
+
+        df = pd.read_csv(file, engine='pyarrow', na_values=['No stats'])
+        df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
+        if 'Player_Name' in df.columns:
             df = df.dropna(subset=['Player_Name', 'Year'])
 
         stats_columns = ['Matches_Batted', 'Not_Outs', 'Runs_Scored', 'Highest_Score', 'Batting_Average',
@@ -180,41 +201,200 @@ def load_data(file):
                         'Wickets_Taken', 'Best_Bowling_Match', 'Bowling_Average', 'Economy_Rate',
                         'Bowling_Strike_Rate', 'Four_Wicket_Hauls', 'Five_Wicket_Hauls']
         
-        for col in stats_columns:
-            if col in df.columns:
-                df[col] = df[col].replace('No stats', np.nan)
-                if col not in ['Best_Bowling_Match', 'Highest_Score']:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
+        numeric_cols = [c for c in stats_columns if c in df.columns and c not in ['Best_Bowling_Match', 'Highest_Score']]
+        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
+        df = df.astype({**dict.fromkeys(numeric_cols, 'float32'), 'Year': 'int16'})
 
-        df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
         if 'Batting_Average' in df.columns:
             df.loc[df['Batting_Average'] > 100, 'Batting_Average'] = np.nan
         
-        df['核心键'] = df['Player_Name'].astype(str) + '_' + df['Year'].astype(str).fillna('NaN')
-        df = df.drop_duplicates(subset=['核心键'], keep='first')
-        df.drop('核心键', axis=1, inplace=True)
+        df = df.drop_duplicates(subset=['Player_Name', 'Year'], keep='first')
+        df['Player_Name'] = df['Player_Name'].astype('category')
+
+        if cache_path:
+            tmp_path = f"{cache_base}.{os.getpid()}.tmp.parquet"
+            try:
+                df.to_parquet(tmp_path)
+                os.replace(tmp_path, cache_path)
+                for old in glob.glob(f"{glob.escape(file)}.v*.parquet"):
+                    if old != cache_path and not old.endswith('.tmp.parquet'):
+                        os.remove(old)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
         
         return df
     except Exception as e:
         st.error(f"数据加载出错: {e}")
         return None
 
+FEATURED_PLAYERS = ['Virat Kohli', 'MS Dhoni', 'Suryakumar Yadav']
+
+def featured_player(df, name):
+    """单个球星的数据，按年份排序"""
+    return df[df['Player_Name'] == name].sort_values('Year')
+
+def prep_runs(df):
+    """图1/6 共用：所有正的年度得分"""
+    runs = df['Runs_Scored']
+    return runs[runs > 0].to_numpy()
+
+def prep_bowling(df):
+    """图2/6/11 共用：三柱门与失分数均为正的投球记录，返回 (三柱门, 失分数) 两个数组"""
+    wk, ba = df['Wickets_Taken'].to_numpy(), df['Bowling_Average'].to_numpy()
+    keep = (wk > 0) & (ba > 0)
+    return wk[keep], ba[keep]
+
+def runs_histogram(df):
+    """图1 的得分直方图 (30 箱) 与两段占比，返回 (计数, 边界, 0-150 分占比, 500+ 分占比)"""
+    runs = prep_runs(df)
+    rate_0_150 = round((np.count_nonzero(runs <= 150) / len(runs) * 100), 1)
+    rate_500_plus = round((np.count_nonzero(runs >= 500) / len(runs) * 100), 1)
+    n, bins = np.histogram(runs, bins=30)
+    return n, bins, rate_0_150, rate_500_plus
+
+def bowling_histogram2d(df):
+    """图11 的失分数-三柱门二维直方图 (20x20)，返回计数矩阵与两轴边界"""
+    wk, ba = prep_bowling(df)
+    H, xe, ye = np.histogram2d(ba, wk, bins=20)
+    return H, xe, ye
+
+@st.cache_data
+def build_summaries(df):
+    """图8/10/12/14/15 用到的分组汇总"""
+    recent = df[df['Year']>=2010]
+    totals = df.groupby('Player_Name', observed=True, sort=False)['Runs_Scored'].sum()
+    vals = totals.to_numpy()
+    k = min(5, len(vals))
+    part = np.argpartition(-vals, k - 1)[:k]
+    top5 = totals.index[part[np.argsort(-vals[part], kind='stable')]]
+
+    bowl = df[(df['Year']>=2020) & (df['Balls_Bowled']>0)]
+    bowl_cols = ['Economy_Rate', 'Wickets_Taken', 'Balls_Bowled', 'Matches_Bowled']
+    bowler_stats = bowl[bowl_cols].fillna(0).groupby(bowl['Player_Name'], observed=True).agg({
+        'Economy_Rate': 'mean',
+        'Wickets_Taken': 'sum',
+        'Balls_Bowled': 'sum',
+        'Matches_Bowled': 'sum'
+    }).reset_index()
+
+    ba, wt = recent['Batting_Average'].to_numpy(), recent['Wickets_Taken'].to_numpy()
+    types = np.select([ba > 25, wt > 5], ['击球手', '投手'], default='边缘')
+
+    return {
+        'yearly_struct': recent.groupby('Year')[['Centuries', 'Half_Centuries', 'Fours', 'Sixes', 'Runs_Scored']].sum(),
+        'top5': list(top5),
+        'top5_yearly': df[df['Player_Name'].isin(top5)].groupby(['Player_Name', 'Year'], observed=True)['Runs_Scored'].sum().unstack(0),
+        'year_players': df[df['Year']>=2008].groupby('Year')['Player_Name'].nunique(),
+        'bowler_stats': bowler_stats,
+        'type_share': pd.crosstab(recent['Year'], types, colnames=['Type'], normalize='index')*100,
+    }
+
+def group_mean_std(values, codes, n_groups):
+    """按分组编码一次性求各组均值、样本标准差 (ddof=1) 与计数"""
+    count = np.bincount(codes, minlength=n_groups)
+    mean = np.bincount(codes, weights=values, minlength=n_groups) / count
+    sq = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(sq / (count - 1))
+    return mean, std, count
+
+def fast_linregress(x, y):
+    """一元线性回归，返回 slope, intercept, r"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    mx, my = x.mean(), y.mean()
+    xm, ym = x - mx, y - my
+    sxy, sxx, syy = xm @ ym, xm @ xm, ym @ ym
+    r = float(sxy / np.sqrt(sxx * syy))
+    slope = sxy / sxx
+    return slope, my - slope * mx, r
+
+BOX_YEARS = [2010, 2015, 2020, 2024]
+
+def batting_average_by_year(df):
+    """图4/6 的箱线图数据：指定年份中击球均率为正的记录，返回 (各年数组列表, 各年中位数)"""
+    v = df.loc[df['Year'].isin(BOX_YEARS) & (df['Batting_Average']>0), ['Year', 'Batting_Average']]
+    groups = v.groupby('Year')['Batting_Average']
+    by_year = {y: g.to_numpy() for y, g in groups}
+    med = groups.median()
+    data = [by_year.get(y, np.empty(0, dtype='float32')) for y in BOX_YEARS]
+    medians = [round(float(med[y]), 1) if y in by_year else np.nan for y in BOX_YEARS]
+    return data, medians
+
+def prep_efficiency(df):
+    """图7：2010 年后的场均得分与场均三柱门，返回剔除无效场次后的 (场次, 效率, 总量) 两组数组"""
+    d = df[df['Year']>=2010]
+    mb, rs = d['Matches_Batted'].to_numpy(), d['Runs_Scored'].to_numpy()
+    mo, wt = d['Matches_Bowled'].to_numpy(), d['Wickets_Taken'].to_numpy()
+    e_bat = np.divide(rs, mb, out=np.full_like(rs, np.nan), where=mb>0)
+    e_bowl = np.divide(wt, mo, out=np.full_like(wt, np.nan), where=mo>0)
+    bat, bowl = ~np.isnan(e_bat), ~np.isnan(e_bowl)
+    return (mb[bat], e_bat[bat], rs[bat]), (mo[bowl], e_bowl[bowl], wt[bowl])
+
+AVG_BANDS = [0, 10, 20, 30, 40, 50, 100]
+
+def average_band_stats(df):
+    """图9：2010 年后按击球均率区间统计人数与平均得分，返回 (区间标签, 人数, 平均得分)"""
+    d = df[df['Year']>=2010]
+    bins = AVG_BANDS
+    k = len(bins) - 1
+    avg, runs = d['Batting_Average'].to_numpy(), d['Runs_Scored'].to_numpy()
+    inside = (avg > bins[0]) & (avg <= bins[-1])
+    idx, runs = np.digitize(avg[inside], bins, right=True) - 1, runs[inside]
+    counts = np.bincount(idx, minlength=k)
+    has_runs = ~np.isnan(runs)
+    sums = np.bincount(idx[has_runs], weights=runs[has_runs], minlength=k)
+    with np.errstate(invalid='ignore'):
+        means = sums / np.bincount(idx[has_runs], minlength=k)
+    labels = [f'({lo}, {hi}]' for lo, hi in zip(bins[:-1], bins[1:])]
+    return labels, counts, means
+
+def stability_groups(df):
+    """图13：按参赛年限分段的球员击球均率变异系数 (CV)，返回四段数组的列表"""
+    avg = df['Batting_Average'].to_numpy()
+    keep = avg > 0
+    codes, players = pd.factorize(df['Player_Name'].cat.codes.to_numpy()[keep])
+    mean, std, count = group_mean_std(avg[keep], codes, len(players))
+    cv = std / mean
+    keep = cv <= 2  # 仅出场一年的球员 std 为 NaN，比较结果为 False 被一并剔除
+    cv, count = cv[keep], count[keep]
+    return [cv[(count>=l)&(count<=r)] for l,r in [(1,3),(4,6),(7,9),(10,99)]]
+
+def prep_fielding(df):
+    """图16：2018 年后的接球数与综合得分 (得分 + 三柱门x20)，只保留综合得分为正的记录"""
+    d = df[df['Year']>=2018]
+    catches = np.nan_to_num(d['Catches_Taken'].to_numpy())
+    score = np.nan_to_num(d['Runs_Scored'].to_numpy()) + np.nan_to_num(d['Wickets_Taken'].to_numpy())*20
+    keep = score > 0
+    return catches[keep], score[keep]
+
 # ===================== 3. 图表绘制逻辑 (已去除星号) =====================
 
-def render_fig1(df):
-    valid_runs = df[df['Runs_Scored'].notna()].copy()
-    valid_runs['Runs_Scored'] = pd.to_numeric(valid_runs['Runs_Scored'], errors='coerce')
-    valid_runs = valid_runs[valid_runs['Runs_Scored'] > 0]
+def get_figure(key, figsize):
+    """从当前会话的画布池取出指定图表的 Figure 并清空"""
+    pool = st.session_state.setdefault('fig_pool', {})
+    fig = pool.get(key)
+    if fig is None:
+        fig = pool[key] = Figure(figsize=figsize)
+    else:
+        fig.clear()
+    return fig
 
-    range_0_150 = len(valid_runs[(valid_runs['Runs_Scored'] >= 0) & (valid_runs['Runs_Scored'] <= 150)])
-    range_500_plus = len(valid_runs[valid_runs['Runs_Scored'] >= 500])
-    rate_0_150 = round((range_0_150 / len(valid_runs) * 100), 1)
-    rate_500_plus = round((range_500_plus / len(valid_runs) * 100), 1)
+def dense_scatter(ax, x, y, color, threshold=2000, **kwargs):
+    """单色散点：点数不超过阈值时照常画 scatter，超过时改画同色系 hexbin"""
+    if len(x) <= threshold:
+        return ax.scatter(x, y, color=color, rasterized=True, **kwargs)
+    cmap = LinearSegmentedColormap.from_list('dense', [to_rgba(color, 0.3), to_rgba(color, 1.0)])
+    return ax.hexbin(x, y, gridsize=50, cmap=cmap, mincnt=1, bins='log', linewidths=0)
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    n, bins, patches = ax.hist(valid_runs['Runs_Scored'], bins=30, color='steelblue', edgecolor='black', alpha=0.8)
-    for i, patch in enumerate(patches):
-        if bins[i] >= 0 and bins[i+1] <= 150: patch.set_facecolor('orange')
+def render_fig1(df):
+    n, bins, rate_0_150, rate_500_plus = runs_histogram(df)
+
+    fig = get_figure('fig1', figsize=(10, 6))
+    ax = fig.subplots()
+    colors = np.where((bins[:-1] >= 0) & (bins[1:] <= 150), 'orange', 'steelblue')
+    ax.bar(bins[:-1], n, width=np.diff(bins), align='edge', color=colors, edgecolor='black', alpha=0.8)
 
     ax.text(75, max(n)*0.8, f'0-150分: {rate_0_150}%', ha='center', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
     ax.text(700, max(n)*0.5, f'500+分: {rate_500_plus}%', ha='center', bbox=dict(boxstyle='round', facecolor='lightcoral', alpha=0.8))
@@ -229,18 +409,18 @@ def render_fig1(df):
     return fig, desc
 
 def render_fig2(df):
-    valid_bowling = df[(df['Wickets_Taken']>0) & (df['Bowling_Average']>0)].copy()
-    corr, _ = pearsonr(valid_bowling['Wickets_Taken'], valid_bowling['Bowling_Average'])
-    corr = round(corr, 2)
+    wk, ba = prep_bowling(df)
+    corr = round(fast_linregress(wk, ba)[2], 2)
     
-    wickets_gt15 = valid_bowling[valid_bowling['Wickets_Taken'] > 15]
-    rate_good = round((len(wickets_gt15[wickets_gt15['Bowling_Average'] < 25]) / len(wickets_gt15) * 100), 1) if len(wickets_gt15)>0 else 0
+    elite = wk > 15
+    rate_good = round((ba[elite] < 25).mean() * 100, 1) if elite.any() else 0
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.scatter(valid_bowling['Wickets_Taken'], valid_bowling['Bowling_Average'], alpha=0.6, color='coral', s=40, edgecolor='white')
-    ax.scatter(wickets_gt15['Wickets_Taken'], wickets_gt15['Bowling_Average'], color='darkgreen', s=60, label=f'三柱门>15 (优质率{rate_good}%)')
+    fig = get_figure('fig2', figsize=(10, 6))
+    ax = fig.subplots()
+    dense_scatter(ax, wk, ba, 'coral', alpha=0.6, s=40, edgecolor='white')
+    ax.scatter(wk[elite], ba[elite], color='darkgreen', s=60, label=f'三柱门>15 (优质率{rate_good}%)', rasterized=True)
     
-    ax.text(valid_bowling['Wickets_Taken'].max()*0.7, valid_bowling['Bowling_Average'].max()*0.8, f'Pearson: {corr}', bbox=dict(facecolor='lightblue', alpha=0.8))
+    ax.text(wk.max()*0.7, ba.max()*0.8, f'Pearson: {corr}', bbox=dict(facecolor='lightblue', alpha=0.8))
     ax.set_title('三柱门数与投球平均失分数关系', fontsize=14, fontweight='bold')
     ax.set_xlabel('三柱门数'); ax.set_ylabel('投球平均失分数')
     ax.legend()
@@ -253,42 +433,41 @@ def render_fig2(df):
     return fig, desc
 
 def render_fig3(df):
-    k = df[df['Player_Name'] == 'Virat Kohli'].sort_values('Year')
-    if k.empty: return plt.figure(), "无数据"
+    k = featured_player(df, 'Virat Kohli')
+    if k.empty: return get_figure('fig3', figsize=(12, 6)), "无数据"
     
-    peak = k[(k['Year']>=2013) & (k['Year']<=2018)]
+    lo, hi = np.searchsorted(k['Year'].to_numpy(), [2013, 2019])
+    peak = k.iloc[lo:hi]
+    in_peak = np.zeros(len(k), dtype=bool)
+    in_peak[lo:hi] = True
     peak_max = peak['Runs_Scored'].max() if not peak.empty else 0
     peak_year = peak.loc[peak['Runs_Scored'].idxmax(), 'Year'] if not peak.empty else 0
 
-    fig, ax1 = plt.subplots(figsize=(12, 6))
+    fig = get_figure('fig3', figsize=(12, 6))
+    ax1 = fig.subplots()
     ax1.plot(k['Year'], k['Runs_Scored'], 'b-o', linewidth=2.5, label='得分')
-    ax1.fill_between(k['Year'], 0, k['Runs_Scored'], where=(k['Year']>=2013)&(k['Year']<=2018), color='red', alpha=0.2, label='巅峰期')
+    ax1.fill_between(k['Year'], 0, k['Runs_Scored'], where=in_peak, color='red', alpha=0.2, label='巅峰期')
     
     ax2 = ax1.twinx()
-    ax2.plot(k['Year'], k['Wickets_Taken'].fillna(0), 'r-s', linewidth=2.5, label='三柱门')
+    ax2.plot(k['Year'], np.nan_to_num(k['Wickets_Taken'].to_numpy()), 'r-s', linewidth=2.5, label='三柱门')
     
-    ax1.text(peak_year, peak_max+20, f'巅峰: {peak_max}分', ha='center', bbox=dict(facecolor='yellow', alpha=0.8))
+    ax1.text(peak_year, peak_max+20, f'巅峰: {peak_max:g}分', ha='center', bbox=dict(facecolor='yellow', alpha=0.8))
     ax1.set_title('Virat Kohli 2008-2024年度表现趋势', fontsize=14, fontweight='bold')
     ax1.legend(loc='upper left')
     
     desc = f"""
     生涯轨迹解读：
-    1. 巅峰爆发（2013-2018）：红色区域标记了他的黄金时期，其中{peak_year}年创下 {peak_max} 分的单赛季纪录，统治力惊人。
+    1. 巅峰爆发（2013-2018）：红色区域标记了他的黄金时期，其中{peak_year}年创下 {peak_max:g} 分的单赛季纪录，统治力惊人。
     2. 职业定位：蓝线（得分）极高而红线（三柱门）极低，清晰地表明他是一位极其纯粹且顶级的击球手，几乎不参与投球任务。
     """
     return fig, desc
 
 def render_fig4(df):
-    years = [2010, 2015, 2020, 2024]
-    data = []
-    medians = []
-    for y in years:
-        d = df[(df['Year']==y) & (df['Batting_Average']>0)]['Batting_Average']
-        data.append(d)
-        medians.append(round(d.median(), 1))
+    data, medians = batting_average_by_year(df)
         
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.boxplot(data, labels=years, patch_artist=True, boxprops=dict(facecolor='lightblue'), medianprops=dict(color='red', linewidth=2))
+    fig = get_figure('fig4', figsize=(10, 6))
+    ax = fig.subplots()
+    ax.boxplot(data, labels=BOX_YEARS, patch_artist=True, boxprops=dict(facecolor='lightblue'), medianprops=dict(color='red', linewidth=2))
     
     for i, m in enumerate(medians):
         ax.text(i+1, m+1, f'{m}', ha='center', fontweight='bold')
@@ -304,28 +483,27 @@ def render_fig4(df):
     return fig, desc
 
 def render_fig5(df):
-    target = ['Virat Kohli', 'MS Dhoni', 'Suryakumar Yadav']
     metrics = ['Batting_Average', 'Batting_Strike_Rate', 'Wickets_Taken', 'Bowling_Average', 'Catches_Taken']
     names = ['击球均率', '击球率', '三柱门', '失分(反)', '接球']
     
-    p_df = df[df['Player_Name'].isin(target)].copy()
-    best = p_df.groupby('Player_Name').apply(lambda x: x.nlargest(1, 'Runs_Scored')).reset_index(drop=True)
+    p_df = df[df['Player_Name'].isin(FEATURED_PLAYERS)]
+    p_df = p_df.dropna(subset=['Runs_Scored'])
+    best = p_df.loc[p_df.groupby('Player_Name', observed=True)['Runs_Scored'].idxmax()].reset_index(drop=True)
     
-    if best.empty: return plt.figure(), "无数据"
+    if best.empty: return get_figure('fig5', figsize=(8, 8)), "无数据"
 
-    radar_data = []
-    for _, row in best.iterrows():
-        vals = []
-        for m in metrics:
-            mx = df[m].max()
-            v = row[m] if not pd.isna(row[m]) else 0
-            if m == 'Bowling_Average': vals.append(10 - (v/mx*10) if mx>0 else 0)
-            else: vals.append((v/mx*10) if mx>0 else 0)
-        radar_data.append(vals)
+    values = np.nan_to_num(best[metrics].to_numpy(dtype=float))
+    mx = df[metrics].max().to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(mx > 0, values / mx * 10, 0.0)
+    bowl = metrics.index('Bowling_Average')
+    scores[:, bowl] = np.where(mx[bowl] > 0, 10 - scores[:, bowl], 0.0)  # 失分数越低越好，反向计分
+    radar_data = scores.tolist()
         
     angles = np.linspace(0, 2*np.pi, 5, endpoint=False).tolist() + [0]
     
-    fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(polar=True))
+    fig = get_figure('fig5', figsize=(8, 8))
+    ax = fig.subplots(subplot_kw=dict(polar=True))
     colors = ['#1f77b4', '#2ca02c', '#d62728']
     
     for i, (name, d) in enumerate(zip(best['Player_Name'], radar_data)):
@@ -348,13 +526,12 @@ def render_fig5(df):
 
 def render_fig6(df):
     """图6：完全复刻组合图 (GridSpec)"""
-    runs = df[df['Runs_Scored']>0]['Runs_Scored']
-    bowl = df[(df['Wickets_Taken']>0) & (df['Bowling_Average']>0)]
-    kohli = df[df['Player_Name'] == 'Virat Kohli'].sort_values('Year')
-    years = [2010, 2015, 2020, 2024]
-    box_data = [df[(df['Year']==y) & (df['Batting_Average']>0)]['Batting_Average'] for y in years]
+    runs = prep_runs(df)
+    wk, ba = prep_bowling(df)
+    kohli = featured_player(df, 'Virat Kohli')
+    box_data, _ = batting_average_by_year(df)
     
-    fig = plt.figure(figsize=(18, 12)) 
+    fig = get_figure('fig6', figsize=(18, 12))
     gs = fig.add_gridspec(2, 3, wspace=0.3, hspace=0.3)
     
     ax1 = fig.add_subplot(gs[0, 0])
@@ -362,7 +539,7 @@ def render_fig6(df):
     ax1.set_title('(1) 得分分布', fontsize=10)
     
     ax2 = fig.add_subplot(gs[0, 1])
-    ax2.scatter(bowl['Wickets_Taken'], bowl['Bowling_Average'], alpha=0.5, color='coral', s=10)
+    dense_scatter(ax2, wk, ba, 'coral', alpha=0.5, s=10)
     ax2.set_title('(2) 投球效率', fontsize=10)
     
     ax3 = fig.add_subplot(gs[0, 2])
@@ -370,7 +547,7 @@ def render_fig6(df):
     ax3.set_title('(3) Kohli趋势', fontsize=10)
     
     ax4 = fig.add_subplot(gs[1, 0])
-    ax4.boxplot(box_data, labels=years)
+    ax4.boxplot(box_data, labels=BOX_YEARS)
     ax4.set_title('(4) 年度均率', fontsize=10)
     
     ax5 = fig.add_subplot(gs[1, 1:], polar=True)
@@ -380,7 +557,7 @@ def render_fig6(df):
     ax5.fill(angles, vals, alpha=0.1, color='green')
     ax5.set_title('(5) 综合能力雷达', fontsize=10)
     
-    plt.suptitle('球员表现综合分析看板', fontsize=16, fontweight='bold')
+    fig.suptitle('球员表现综合分析看板', fontsize=16, fontweight='bold')
     
     desc = """
     综合仪表盘：
@@ -394,15 +571,15 @@ def render_fig6(df):
     return fig, desc
 
 def render_fig7(df):
-    d = df[df['Year']>=2010].copy()
-    d['E_Bat'] = d['Runs_Scored']/d['Matches_Batted']
-    d['E_Bowl'] = d['Wickets_Taken']/d['Matches_Bowled']
-    d = d.fillna(0)
+    bat, bowl = prep_efficiency(df)
     
-    fig, ax = plt.subplots(figsize=(12, 7))
-    ax.scatter(d['Matches_Batted'], d['E_Bat'], s=d['Runs_Scored']/10, c='cornflowerblue', alpha=0.5, label='击球效率')
+    fig = get_figure('fig7', figsize=(12, 7))
+    ax = fig.subplots()
+    x, y, runs = bat
+    ax.scatter(x, y, s=runs/10, c='cornflowerblue', alpha=0.5, label='击球效率', rasterized=True)
     ax2 = ax.twinx()
-    ax2.scatter(d['Matches_Bowled'], d['E_Bowl'], s=d['Wickets_Taken']*5, c='tomato', alpha=0.5, label='投球效率')
+    x, y, wickets = bowl
+    ax2.scatter(x, y, s=wickets*5, c='tomato', alpha=0.5, label='投球效率', rasterized=True)
     
     ax.set_xlabel('参赛场次')
     ax.set_ylabel('得分效率', color='cornflowerblue')
@@ -419,10 +596,11 @@ def render_fig7(df):
 
 def render_fig8(df):
     cols = ['Centuries', 'Half_Centuries', 'Fours', 'Sixes']
-    d = df[df['Year']>=2010].groupby('Year')[cols + ['Runs_Scored']].sum()
+    d = build_summaries(df)['yearly_struct']
     for c in cols: d[c] = d[c]/d['Runs_Scored']*100
     
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = get_figure('fig8', figsize=(12, 7))
+    ax = fig.subplots()
     ax.stackplot(d.index, [d[c] for c in cols], labels=cols, alpha=0.8)
     ax.legend(loc='upper right')
     ax.set_title('得分结构年度变化', fontsize=14, fontweight='bold')
@@ -436,14 +614,13 @@ def render_fig8(df):
     return fig, desc
 
 def render_fig9(df):
-    d = df[(df['Year']>=2010)].copy()
-    d['G'] = pd.cut(d['Batting_Average'], bins=[0,10,20,30,40,50,100])
-    s = d.groupby('G').agg({'Player_Name':'count', 'Runs_Scored':'mean'})
+    labels, counts, means = average_band_stats(df)
     
-    fig, ax = plt.subplots(figsize=(12, 7))
-    ax.bar(s.index.astype(str), s['Player_Name'], color='lightseagreen', alpha=0.6, label='人数')
+    fig = get_figure('fig9', figsize=(12, 7))
+    ax = fig.subplots()
+    ax.bar(labels, counts, color='lightseagreen', alpha=0.6, label='人数')
     ax2 = ax.twinx()
-    ax2.plot(s.index.astype(str), s['Runs_Scored'], 'ro-', linewidth=2, label='平均得分')
+    ax2.plot(labels, means, 'ro-', linewidth=2, label='平均得分')
     
     ax.set_title('击球平均率区间分布与得分关系', fontsize=14, fontweight='bold')
     ax.set_ylabel('球员人数', color='lightseagreen')
@@ -457,10 +634,12 @@ def render_fig9(df):
     return fig, desc
 
 def render_fig10(df):
-    top5 = df.groupby('Player_Name')['Runs_Scored'].sum().nlargest(5).index
-    fig, ax = plt.subplots(figsize=(12, 7))
+    summaries = build_summaries(df)
+    top5, pivot = summaries['top5'], summaries['top5_yearly']
+    fig = get_figure('fig10', figsize=(12, 7))
+    ax = fig.subplots()
     for p in top5:
-        d = df[df['Player_Name']==p].groupby('Year')['Runs_Scored'].sum()
+        d = pivot[p].dropna()  # 去掉该球员未参赛的年份，保持折线连续
         ax.plot(d.index, d.values, 'o-', label=p)
     ax.legend()
     ax.set_title('历史得分榜TOP5球员年度趋势', fontsize=14, fontweight='bold')
@@ -473,10 +652,11 @@ def render_fig10(df):
     return fig, desc
 
 def render_fig11(df):
-    d = df[(df['Bowling_Average']>0) & (df['Wickets_Taken']>0)]
-    fig, ax = plt.subplots(figsize=(12, 7))
-    h = ax.hist2d(d['Bowling_Average'], d['Wickets_Taken'], bins=20, cmap='YlOrRd')
-    plt.colorbar(h[3], ax=ax, label='密度')
+    H, xe, ye = bowling_histogram2d(df)
+    fig = get_figure('fig11', figsize=(12, 7))
+    ax = fig.subplots()
+    im = ax.imshow(H.T, origin='lower', extent=[xe[0], xe[-1], ye[0], ye[-1]], aspect='auto', interpolation='nearest', cmap='YlOrRd')
+    fig.colorbar(im, ax=ax, label='密度')
     ax.axvline(30, color='g', linestyle='--', label='高效失分<30')
     ax.axhline(20, color='b', linestyle='--', label='高效三柱门>20')
     ax.set_title('投球效率密度热力图', fontsize=14, fontweight='bold')
@@ -491,11 +671,11 @@ def render_fig11(df):
     return fig, desc
 
 def render_fig12(df):
-    d = df[df['Year']>=2008].groupby('Year')['Player_Name'].nunique()
-    fig, ax = plt.subplots(figsize=(12, 7))
-    ax.barh(d.index, d.values, color='skyblue')
-    for i, v in zip(d.index, d.values):
-        ax.text(v+1, i, str(v), va='center')
+    d = build_summaries(df)['year_players']
+    fig = get_figure('fig12', figsize=(12, 7))
+    ax = fig.subplots()
+    bars = ax.barh(d.index, d.values, color='skyblue')
+    ax.bar_label(bars, fmt='%d', padding=3)
     ax.set_title('IPL历年参赛球员数量', fontsize=14, fontweight='bold')
     
     desc = """
@@ -506,14 +686,11 @@ def render_fig12(df):
     return fig, desc
 
 def render_fig13(df):
-    d = df[df['Batting_Average']>0].groupby('Player_Name')['Batting_Average'].agg(['mean','std','count']).dropna()
-    d['cv'] = d['std']/d['mean']
-    d = d[d['cv']<=2]
-    
-    groups = [d[(d['count']>=l)&(d['count']<=r)]['cv'] for l,r in [(1,3),(4,6),(7,9),(10,99)]]
+    groups = stability_groups(df)
     labels = ['1-3年', '4-6年', '7-9年', '10年+']
     
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = get_figure('fig13', figsize=(12, 7))
+    ax = fig.subplots()
     ax.violinplot(groups, showmedians=True)
     ax.set_xticks(range(1,5)); ax.set_xticklabels(labels)
     ax.set_title('参赛年限与表现稳定性分析', fontsize=14, fontweight='bold')
@@ -527,29 +704,19 @@ def render_fig13(df):
     return fig, desc
 
 def render_fig14(df):
-    d = df[(df['Year']>=2020) & (df['Balls_Bowled']>0)].copy()
-    numeric_cols = ['Economy_Rate', 'Wickets_Taken', 'Balls_Bowled', 'Matches_Bowled']
-    for col in numeric_cols:
-        d[col] = pd.to_numeric(d[col], errors='coerce').fillna(0)
-        
-    pitcher_stats = d.groupby('Player_Name').agg({
-        'Economy_Rate': 'mean',
-        'Wickets_Taken': 'sum',
-        'Balls_Bowled': 'sum',
-        'Matches_Bowled': 'sum'
-    }).reset_index()
-    
+    pitcher_stats = build_summaries(df)['bowler_stats']
     pitcher_stats['Eff'] = pitcher_stats['Wickets_Taken'] / pitcher_stats['Balls_Bowled'] * 100
     pitcher_stats = pitcher_stats[(pitcher_stats['Economy_Rate'] < 15) & (pitcher_stats['Eff'] < 15)]
     
     med_x = pitcher_stats['Economy_Rate'].median()
     med_y = pitcher_stats['Eff'].median()
     
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = get_figure('fig14', figsize=(12, 7))
+    ax = fig.subplots()
     colors = np.where((pitcher_stats['Economy_Rate']<med_x) & (pitcher_stats['Eff']>med_y), '#27AE60', 
              np.where((pitcher_stats['Economy_Rate']>med_x) & (pitcher_stats['Eff']<med_y), '#E74C3C', 'gray'))
              
-    ax.scatter(pitcher_stats['Economy_Rate'], pitcher_stats['Eff'], c=colors, alpha=0.6, s=pitcher_stats['Matches_Bowled']*5)
+    ax.scatter(pitcher_stats['Economy_Rate'], pitcher_stats['Eff'], c=colors, alpha=0.6, s=pitcher_stats['Matches_Bowled']*5, rasterized=True)
     ax.axvline(med_x, linestyle='--', color='k')
     ax.axhline(med_y, linestyle='--', color='k')
     
@@ -565,12 +732,10 @@ def render_fig14(df):
     return fig, desc
 
 def render_fig15(df):
-    d = df[df['Year']>=2010].copy()
-    d['Type'] = d.apply(lambda r: '击球手' if r['Batting_Average']>25 else ('投手' if r['Wickets_Taken']>5 else '边缘'), axis=1)
-    s = d.groupby(['Year', 'Type']).size().unstack().fillna(0)
-    s = s.div(s.sum(axis=1), axis=0)*100
+    s = build_summaries(df)['type_share']
     
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = get_figure('fig15', figsize=(12, 7))
+    ax = fig.subplots()
     s.plot(kind='barh', stacked=True, ax=ax, colormap='Set3')
     ax.set_title('球员类型分布演变', fontsize=14, fontweight='bold')
     ax.legend(loc='upper right')
@@ -583,15 +748,14 @@ def render_fig15(df):
     return fig, desc
 
 def render_fig16(df):
-    d = df[df['Year']>=2018].fillna(0).copy()
-    d['Score'] = d['Runs_Scored'] + d['Wickets_Taken']*20
-    d = d[d['Score']>0]
-    
-    slope, intercept, r, p, _ = linregress(d['Catches_Taken'], d['Score'])
-    
-    fig, ax = plt.subplots(figsize=(12, 7))
-    ax.scatter(d['Catches_Taken'], d['Score'], alpha=0.5, c='#9B59B6')
-    ax.plot(d['Catches_Taken'], slope*d['Catches_Taken']+intercept, 'r--', label=f'r={r:.2f}')
+    catches, score = prep_fielding(df)
+    slope, intercept, r = fast_linregress(catches, score)
+    
+    fig = get_figure('fig16', figsize=(12, 7))
+    ax = fig.subplots()
+    dense_scatter(ax, catches, score, '#9B59B6', alpha=0.5)
+    x = np.array([catches.min(), catches.max()]) if len(catches) else catches
+    ax.plot(x, slope*x+intercept, 'r--', label=f'r={r:.2f}')
     ax.set_title('接球能力与综合表现相关性', fontsize=14, fontweight='bold')
     ax.set_xlabel('接球数'); ax.set_ylabel('综合得分')
     ax.legend()
@@ -605,6 +769,50 @@ def render_fig16(df):
 
 # ===================== 4. 页面布局逻辑 =====================
 
+# 路由映射
+chart_map = {
+    "📊 数据总览": {
+        "图1: 年度得分分布 (直方图)": render_fig1,
+        "图12: 参赛规模扩张 (条形图)": render_fig12,
+        "图15: 球员类型演变 (堆叠图)": render_fig15
+    },
+    "🏏 击球深度分析": {
+        "图4: 击球均率分布 (箱线图)": render_fig4,
+        "图8: 得分结构变化 (堆叠面积)": render_fig8,
+        "图9: 均率与得分关系 (双轴图)": render_fig9,
+        "图10: 历史得分王趋势 (多线图)": render_fig10,
+        "图13: 表现稳定性分析 (小提琴)": render_fig13
+    },
+    "🥎 投球深度分析": {
+        "图2: 三柱门与失分 (散点图)": render_fig2,
+        "图11: 投球黄金区域 (热力图)": render_fig11,
+        "图14: 投手效能四象限 (象限图)": render_fig14
+    },
+    "🔗 综合与关联": {
+        "图6: 综合数据仪表盘 (组合图)": render_fig6,
+        "图7: 攻守效率矩阵 (气泡图)": render_fig7,
+        "图16: 防守与综合表现 (回归分析)": render_fig16
+    },
+    "⭐ 球星特写": {
+        "图3: Virat Kohli 生涯轨迹": render_fig3,
+        "图5: 顶级球星能力雷达": render_fig5
+    }
+}
+CHART_FUNCS = {title: func for charts in chart_map.values() for title, func in charts.items()}
+
+@st.cache_data
+def render_png(chart_key, df):
+    """把图表渲染成 PNG 字节，按 (图表, 数据) 缓存"""
+    fig, desc = CHART_FUNCS[chart_key](df)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=90, bbox_inches='tight')
+    return buf.getvalue(), desc
+
+def prerender_all(df):
+    """依次渲染全部图表，填充 render_png 缓存"""
+    for chart_key in CHART_FUNCS:
+        render_png(chart_key, df)
+
 # 侧边栏：文件加载
 with st.sidebar:
     st.markdown("## 🏏 导航控制台") # 使用文字标题代替图片
@@ -614,16 +822,20 @@ with st.sidebar:
     ALT_FILE = "6-球员生命周期_预处理后.csv"
     
     df = None
+    data_key = None
     if os.path.exists(DEFAULT_FILE):
         df = load_data(DEFAULT_FILE)
+        data_key = DEFAULT_FILE
         st.success(f"已加载: {DEFAULT_FILE}")
     elif os.path.exists(ALT_FILE):
         df = load_data(ALT_FILE)
+        data_key = ALT_FILE
         st.success(f"已加载: {ALT_FILE}")
     else:
         uploaded_file = st.file_uploader("请上传数据文件 (CSV)", type=['csv'])
         if uploaded_file:
             df = load_data(uploaded_file)
+            data_key = uploaded_file.file_id
 
     if df is not None:
         st.markdown("### 📊 功能模块")
@@ -632,6 +844,11 @@ with st.sidebar:
             ("🏠 首页大屏", "📊 数据总览", "🏏 击球深度分析", "🥎 投球深度分析", "🔗 综合与关联", "⭐ 球星特写"),
             label_visibility="collapsed"
         )
+        if st.checkbox("预渲染所有图表", help="立即渲染全部 16 张图表 (需等待片刻)，之后切换图表无需等待") \
+                and st.session_state.get('prerendered') != data_key:
+            with st.spinner("正在预渲染全部图表..."):
+                prerender_all(df)
+            st.session_state['prerendered'] = data_key
 
 # 主内容区域
 if df is None:
@@ -661,36 +878,6 @@ elif menu == "🏠 首页大屏":
     st.info("本系统集成了 **16 个专业分析模型**，为您提供全方位的板球数据洞察。请点击左侧导航栏切换分析视角。")
 
 else:
-    # 路由映射
-    chart_map = {
-        "📊 数据总览": {
-            "图1: 年度得分分布 (直方图)": render_fig1,
-            "图12: 参赛规模扩张 (条形图)": render_fig12,
-            "图15: 球员类型演变 (堆叠图)": render_fig15
-        },
-        "🏏 击球深度分析": {
-            "图4: 击球均率分布 (箱线图)": render_fig4,
-            "图8: 得分结构变化 (堆叠面积)": render_fig8,
-            "图9: 均率与得分关系 (双轴图)": render_fig9,
-            "图10: 历史得分王趋势 (多线图)": render_fig10,
-            "图13: 表现稳定性分析 (小提琴)": render_fig13
-        },
-        "🥎 投球深度分析": {
-            "图2: 三柱门与失分 (散点图)": render_fig2,
-            "图11: 投球黄金区域 (热力图)": render_fig11,
-            "图14: 投手效能四象限 (象限图)": render_fig14
-        },
-        "🔗 综合与关联": {
-            "图6: 综合数据仪表盘 (组合图)": render_fig6,
-            "图7: 攻守效率矩阵 (气泡图)": render_fig7,
-            "图16: 防守与综合表现 (回归分析)": render_fig16
-        },
-        "⭐ 球星特写": {
-            "图3: Virat Kohli 生涯轨迹": render_fig3,
-            "图5: 顶级球星能力雷达": render_fig5
-        }
-    }
-    
     charts = chart_map[menu]
     selected_chart = st.sidebar.radio("选择图表:", list(charts.keys()))
     
@@ -699,12 +886,11 @@ else:
     # === 核心布局：3:1 比例 ===
     c_chart, c_text = st.columns([3, 1])
     
-    func = charts[selected_chart]
-    fig, desc = func(df)
+    png, desc = render_png(selected_chart, df)
     
     with c_chart:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        st.pyplot(fig, use_container_width=True)
+        st.image(png, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
         
     with c_text: